@@ -3,18 +3,25 @@
 '''
 
 import argparse
+from functools import lru_cache
 from io import BytesIO
 import json
-import os
 import re
 import sys
+import threading
+import time
 import colorlog
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import dask
 from dask.callbacks import Callback
-from PIL import Image
+from dask.diagnostics import Profiler, ResourceProfiler, visualize
+import imagecodecs
 import requests
+from requests.adapters import HTTPAdapter, Retry
+import tifffile
 from simple_term_menu import TerminalMenu
 from tqdm.auto import tqdm
 import neuronbridge_lib as NB
@@ -25,17 +32,34 @@ __version__ = '1.0.0'
 CONFIG = {'config': {'url': 'http://config.int.janelia.org/'}}
 AWS = dict()
 S3_SECONDS = 60 * 60 * 12
+SEARCHABLE = 'searchable_neurons'
+BOTO_CONFIG = Config(max_pool_connections=64, retries={'mode': 'adaptive'})
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024,
+                                 multipart_chunksize=8 * 1024 * 1024,
+                                 max_concurrency=16, use_threads=True)
+TRANSFER = None
+# Shared S3 client (credentials from AssumeRole expire, so track that)
+S3_CLIENT = None
+S3_EXPIRES = 0
+S3_LOCK = threading.Lock()
+# HTTP session with connection reuse and retries
+SESSION = requests.Session()
+ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                      max_retries=Retry(total=3, backoff_factor=0.5))
+SESSION.mount('http://', ADAPTER)
+SESSION.mount('https://', ADAPTER)
 
 
+@lru_cache(maxsize=128)
 def call_responder(server, endpoint):
-    """ Call a responder
+    """ Call a responder (results are memoized per server/endpoint)
         Keyword arguments:
         server: server
         endpoint: REST endpoint
     """
     url = CONFIG[server]['url'] + endpoint
     try:
-        req = requests.get(url)
+        req = SESSION.get(url, timeout=10)
     except requests.exceptions.RequestException as err:
         LOGGER.critical(err)
         sys.exit(-1)
@@ -71,12 +95,44 @@ def initialize_s3():
         s3_client = boto3.client('s3',
                                  aws_access_key_id=credentials['AccessKeyId'],
                                  aws_secret_access_key=credentials['SecretAccessKey'],
-                                 aws_session_token=credentials['SessionToken'])
+                                 aws_session_token=credentials['SessionToken'],
+                                 config=BOTO_CONFIG)
     else:
-        s3_client = boto3.client('s3')
+        s3_client = boto3.client('s3', config=BOTO_CONFIG)
     return s3_client
 
 
+def get_s3_client():
+    """ Return the shared S3 client, refreshing it near credential expiry
+        Keyword arguments:
+          None
+        Returns:
+          S3 client
+    """
+    global S3_CLIENT, S3_EXPIRES, TRANSFER # pylint: disable=W0603
+    with S3_LOCK:
+        if not S3_CLIENT or time.time() > S3_EXPIRES - 300:
+            S3_CLIENT = initialize_s3()
+            S3_EXPIRES = time.time() + S3_SECONDS
+            # The transfer manager is bound to the client, so rebuild it
+            TRANSFER = None
+        return S3_CLIENT
+
+
+def get_transfer_manager(client):
+    """ Return the shared S3 transfer manager, creating it on first use
+        Keyword arguments:
+          client: S3 client
+        Returns:
+          Transfer manager
+    """
+    global TRANSFER # pylint: disable=W0603
+    with S3_LOCK:
+        if not TRANSFER:
+            TRANSFER = create_transfer_manager(client, TRANSFER_CONFIG)
+        return TRANSFER
+
+
 def get_keyfile(client, bucket):
     if not ARG.TEMPLATE:
         ARG.TEMPLATE = NB.get_template(client, bucket)
@@ -108,18 +164,18 @@ def get_keyfile(client, bucket):
     return data
 
 
-def convert_img(img, newname):
-    ''' Convert file to PNG format
+def convert_img(content, newname):
+    ''' Convert TIFF image content to PNG format
         Keyword arguments:
-          img: PIL image object
+          content: TIFF image content (bytes)
           newname: new file name
         Returns:
-          New filepath
+          PNG image content (bytes)
     '''
     LOGGER.debug("Converting %s", newname)
-    newpath = '/tmp/pngs/' + newname
-    img.save(newpath, 'PNG')
-    return newpath
+    arr = tifffile.imread(BytesIO(content))
+    # These PNGs are transient, so encode at minimal compression
+    return imagecodecs.png_encode(arr, level=1)
 
 
 def upload_aws(client, bucket, sourcepath, targetpath):
@@ -127,38 +183,51 @@ def upload_aws(client, bucket, sourcepath, targetpath):
         Keyword arguments:
           client: S3 client
           bucket: S3 bucket
-          sourcepath: source path
+          sourcepath: source path or seekable file object
           targetpath: target path
         Returns:
-          url
+          upload future
     """
     LOGGER.debug("Uploading %s", targetpath)
     payload = {'ContentType': 'image/png'}
     if ARG.MANIFOLD == 'prod':
         payload['ACL'] = 'public-read'
     try:
-        client.upload_file(sourcepath, bucket, targetpath, ExtraArgs=payload)
+        return get_transfer_manager(client).upload(sourcepath, bucket,
+                                                   targetpath, extra_args=payload)
     except Exception as err:
         LOGGER.critical(err)
+    return None
 
 
 def convert_single_file(bucket, key):
-    s3_client = initialize_s3()
+    s3_client = get_s3_client()
     try:
         s3_response_object = s3_client.get_object(Bucket=bucket, Key=key)
         object_content = s3_response_object['Body'].read()
-        data_bytes_io = BytesIO(object_content)
-        img = Image.open(data_bytes_io)
     except Exception as err:
         LOGGER.critical(err)
-    if img.format != 'TIFF':
+        return
+    if object_content[:4] not in (b'II*\x00', b'MM\x00*'):
         LOGGER.error("%s is not a TIFF file", key)
-    file = key.split('/')[-1].replace('.tif', '.png')
-    tmp_path = convert_img(img, file)
-    upload_path = re.sub(r'searchable_neurons.*', 'searchable_neurons/pngs/', key)
+        return
+    file = key.rsplit('/', 1)[-1].replace('.tif', '.png')
+    png_content = convert_img(object_content, file)
+    # Literal partition is much cheaper than re.sub for a fixed prefix
+    upload_path = key.partition(SEARCHABLE)[0] + SEARCHABLE + '/pngs/'
     if ARG.AWS:
-        upload_aws(s3_client, bucket, tmp_path, upload_path + file)
-        os.remove(tmp_path)
+        # Upload straight from memory - no /tmp staging
+        future = upload_aws(s3_client, bucket, BytesIO(png_content),
+                            upload_path + file)
+        if future:
+            # Transfer errors surface here, not at submission
+            try:
+                future.result()
+            except Exception as err:
+                LOGGER.critical(err)
+    else:
+        with open('/tmp/pngs/' + file, 'wb') as handle:
+            handle.write(png_content)
 
 
 class ProgressBar(Callback):
@@ -182,22 +251,31 @@ def convert_tiffs():
           None
     """
     #pylint: disable=no-member
-    s3_client = initialize_s3()
+    s3_client = get_s3_client()
     bucket = "janelia-flylight-color-depth"
     if ARG.MANIFOLD != 'prod':
         bucket += '-' + ARG.MANIFOLD
     data = get_keyfile(s3_client, bucket)
     parallel = []
     LOGGER.info("Preparing Dask")
+    subdivision = re.compile(".+(/" + ARG.REGEX + "/)")
     for key in data:
-        if not re.match(".+(\/" + ARG.REGEX + "\/)", key):
+        if not subdivision.match(key):
             continue
         if '.tif' not in key.lower():
             continue
         parallel.append(dask.delayed(convert_single_file)(bucket, key))
     print("Creating %sPNGs" % ('and uploading ' if ARG.AWS else ''))
-    with ProgressBar():
-        dask.compute(*parallel, num_workers=12)
+    if ARG.DEBUG:
+        # Capture per-task and resource profiles to find the hot phase
+        with Profiler() as prof, ResourceProfiler(dt=0.25) as rprof, ProgressBar():
+            dask.compute(*parallel, num_workers=12)
+        visualize([prof, rprof], save=True, show=False,
+                  filename='tiff_profile.html')
+        print("Wrote profile to tiff_profile.html")
+    else:
+        with ProgressBar():
+            dask.compute(*parallel, num_workers=12)
 
 
 if __name__ == '__main__':
@@ -3,23 +3,31 @@
 '''
 
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import cProfile
+import errno
+from functools import lru_cache
 from glob import glob
 from datetime import datetime, timezone
 from io import BytesIO
-import json
+from itertools import islice
 import os
 from pathlib import Path
+import pstats
 import re
 import shutil
 import sys
+import threading
+import time
 import colorlog
 import boto3
+import ijson
+import orjson
 from botocore.exceptions import ClientError
-import dask
-from dask.callbacks import Callback
 from PIL import Image
 from pymongo import MongoClient
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from simple_term_menu import TerminalMenu
 from tqdm.auto import tqdm
 
@@ -31,6 +39,10 @@ CONFIG = {'config': {'url': 'http://config.int.janelia.org/'}}
 AWS = dict()
 DATABASE = dict()
 S3_SECONDS = 60 * 60 * 12
+# Shared S3 client (credentials from AssumeRole expire, so track that)
+S3_CLIENT = None
+S3_EXPIRES = 0
+S3_LOCK = threading.Lock()
 # Database
 DBM = ''
 # General use
@@ -38,29 +50,32 @@ NEURONBRIDGE_JSON_BASE = '/nrs/neuronbridge'
 PPP_BASE = NEURONBRIDGE_JSON_BASE + '/ppp_imagery'
 RENAME_COMPONENTS = ['maskPublishedName',
                      'publishedName', 'slideCode', 'objective']
+COPY_WORKERS = 16
+# One shared pool for deferred file copies; tasks run concurrently, so a
+# per-task pool would multiply threads
+COPY_POOL = ThreadPoolExecutor(max_workers=COPY_WORKERS)
+# Stream (rather than load) JSON files larger than this
+STREAM_THRESHOLD = 100 * 1024 * 1024
 ERROR_ID = dict()
 TEMPLATE = "An exception of type %s occurred. Arguments:\n%s"
+# HTTP session with connection reuse and retries
+SESSION = requests.Session()
+ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                      max_retries=Retry(total=3, backoff_factor=0.5))
+SESSION.mount('http://', ADAPTER)
+SESSION.mount('https://', ADAPTER)
 # pylint: disable=W0703
 
 # -------------------------------------------------------------------------------
 
-class ProgressBar(Callback):
-    """ Callback to replace Dask progress bar
+class PPPError(Exception):
+    """ Error while processing a single body ID file. Raised (rather than
+        exiting) so one bad file doesn't take down the worker pool.
     """
-    def _start_state(self, _, state):
-        self._tqdm = tqdm(total=sum(len(state[k]) for k in ['ready', 'waiting',
-                                                            'running', 'finished']),
-                          colour='green')
-
-    def _posttask(self, key, result, dsk, state, worker_id):
-        self._tqdm.update(1)
-
-    def _finish(self, dsk, state, errored):
-        pass
-
 
+@lru_cache(maxsize=128)
 def call_responder(server, endpoint):
-    """ Call a responder
+    """ Call a responder (results are memoized per server/endpoint)
         Keyword arguments:
           server: server
           endpoint: REST endpoint
@@ -69,7 +84,7 @@ def call_responder(server, endpoint):
     """
     url = CONFIG[server]['url'] + endpoint
     try:
-        req = requests.get(url)
+        req = SESSION.get(url, timeout=10)
     except requests.exceptions.RequestException as err:
         LOGGER.critical(err)
         sys.exit(-1)
@@ -127,6 +142,21 @@ def initialize_s3():
     return s3c
 
 
+def get_s3_client():
+    """ Return the shared S3 client, refreshing it near credential expiry
+        Keyword arguments:
+          None
+        Returns:
+          S3 client
+    """
+    global S3_CLIENT, S3_EXPIRES # pylint: disable=W0603
+    with S3_LOCK:
+        if not S3_CLIENT or time.time() > S3_EXPIRES - 300:
+            S3_CLIENT = initialize_s3()
+            S3_EXPIRES = time.time() + S3_SECONDS
+        return S3_CLIENT
+
+
 def get_template(client, bucket):
     """ Prompt the user for a template selected from AWS S3 prefixes
         Keyword arguments:
@@ -137,7 +167,7 @@ def get_template(client, bucket):
     """
     template = list()
     try:
-        paginator = client.get_paginator('list_objects')
+        paginator = client.get_paginator('list_objects_v2')
         response = paginator.paginate(Bucket=bucket, Delimiter='/')
     except ClientError as err:
         LOGGER.critical(err)
@@ -156,6 +186,24 @@ def get_template(client, bucket):
     ARG.TEMPLATE = template[chosen]
 
 
+def library_has_keyfile(client, bucket, prefixname):
+    """ Check a library prefix for a denormalized key file
+        Keyword arguments:
+          client: S3 client
+          bucket: S3 bucket
+          prefixname: library prefix name
+        Returns:
+          prefixname if the key file exists, otherwise None
+    """
+    key = ARG.TEMPLATE + '/' + prefixname \
+          + '/searchable_neurons/keys_denormalized.json'
+    try:
+        client.head_object(Bucket=bucket, Key=key)
+        return prefixname
+    except ClientError:
+        return None
+
+
 def get_library(client, bucket):
     """ Prompt the user for a library selected from AWS S3 prefixes
         Keyword arguments:
@@ -164,29 +212,28 @@ def get_library(client, bucket):
         Returns:
           None (sets ARG.LIBRARY)
     """
-    library = list()
     try:
-        response = client.list_objects_v2(Bucket=bucket,
-                                          Prefix=ARG.TEMPLATE + '/',
-                                          Delimiter='/')
+        paginator = client.get_paginator('list_objects_v2')
+        response = paginator.paginate(Bucket=bucket,
+                                      Prefix=ARG.TEMPLATE + '/',
+                                      Delimiter='/')
+        prefixes = [prefix.get('Prefix').split('/')[-2]
+                    for prefix in response.search('CommonPrefixes') if prefix]
     except ClientError as err:
         LOGGER.critical(err)
         sys.exit(-1)
     except Exception as err:
         LOGGER.critical(err)
         sys.exit(-1)
-    if 'CommonPrefixes' not in response:
+    if not prefixes:
         LOGGER.critical("Could not find any libraries")
         sys.exit(-1)
-    for prefix in response['CommonPrefixes']:
-        prefixname = prefix['Prefix'].split('/')[-2]
-        try:
-            key = ARG.TEMPLATE + '/' + prefixname \
-                  + '/searchable_neurons/keys_denormalized.json'
-            client.head_object(Bucket=bucket, Key=key)
-            library.append(prefixname)
-        except ClientError:
-            pass
+    # Probe all prefixes concurrently; each HEAD is a WAN round trip
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        futures = [executor.submit(library_has_keyfile, client, bucket, pre)
+                   for pre in prefixes]
+        library = [future.result() for future in futures]
+    library = [name for name in library if name]
     print("Select a library:")
     terminal_menu = TerminalMenu(library)
     chosen = terminal_menu.show()
@@ -203,8 +250,8 @@ def get_nb_version():
         Returns:
           None (sets ARG.NEURONBRIDGE)
     """
-    version = [re.sub('.*/', '', path)
-               for path in glob(NEURONBRIDGE_JSON_BASE + '/v[0-9]*')]
+    version = [entry.name for entry in os.scandir(NEURONBRIDGE_JSON_BASE)
+               if entry.name.startswith('v') and entry.name[1:2].isdigit()]
     print("Select a NeuronBridge version:")
     terminal_menu = TerminalMenu(version)
     chosen = terminal_menu.show()
@@ -247,11 +294,11 @@ def check_data_format(data):
     return checked
 
 
-def set_payload(body_id, data):
+def set_payload(body_id, results_found):
     """ Set the payload for a nre document in Mongo
         Keyword arguments:
           body_id: body ID
-          data: JSON data for body ID
+          results_found: number of results for body ID
         Returns:
           Payload dictionary
     """
@@ -259,7 +306,7 @@ def set_payload(body_id, data):
             "template": ARG.TEMPLATE,
             "library": ARG.LIBRARY,
             "version": ARG.NEURONBRIDGE,
-            "resultsFound": len(data['results']),
+            "resultsFound": results_found,
             "resultsUpdated": 0,
             "resultsSkipped": 0,
             "filesFound": 0,
@@ -286,9 +333,57 @@ def write_file(source_path, newdir, newname):
         else:
             shutil.copy2(source_path, newpath)
     except Exception as err:
-        LOGGER.error("Could not copy %s to %s", source_path, newpath)
         LOGGER.error(TEMPLATE, type(err).__name__, err.args)
-        sys.exit(-1)
+        raise PPPError("Could not copy %s to %s" % (source_path, newpath)) from err
+
+
+def fast_copy(source_path, newpath):
+    """ Copy a file using an in-kernel copy (no userspace buffer round-trip)
+        Keyword arguments:
+          source_path: source directory/filename
+          newpath: target directory/filename
+        Returns:
+          None
+    """
+    try:
+        src = os.open(source_path, os.O_RDONLY)
+        try:
+            dst = os.open(newpath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                remaining = os.fstat(src).st_size
+                offset = 0
+                while remaining > 0:
+                    try:
+                        copied = os.copy_file_range(src, dst, remaining)
+                    except OSError as err:
+                        if err.errno not in (errno.ENOSYS, errno.EXDEV):
+                            raise
+                        copied = os.sendfile(dst, src, offset, remaining)
+                    if not copied:
+                        break
+                    offset += copied
+                    remaining -= copied
+            finally:
+                os.close(dst)
+        finally:
+            os.close(src)
+        shutil.copystat(source_path, newpath)
+    except Exception as err:
+        LOGGER.error(TEMPLATE, type(err).__name__, err.args)
+        raise PPPError("Could not copy %s to %s" % (source_path, newpath)) from err
+
+
+def copy_file_batch(copy_jobs):
+    """ Copy a batch of files in parallel to overlap NFS round trips
+        Keyword arguments:
+          copy_jobs: list of (source_path, newpath) tuples
+        Returns:
+          None
+    """
+    futures = [COPY_POOL.submit(fast_copy, source_path, newpath)
+               for source_path, newpath in copy_jobs]
+    for future in futures:
+        future.result()
 
 
 def upload_aws(client, bucket, sourcepath, targetpath):
@@ -337,104 +432,152 @@ def handle_single_json_file(path):
         Returns:
           None
     """
-    s3_client = initialize_s3()
+    s3_client = get_s3_client()
     bucket = AWS['s3_bucket']['ppp']
     bucket += '-' + ARG.MANIFOLD
-    # Read JSON file into data
+    # Read JSON file into data; stream the results array for very large
+    # files to keep per-worker memory bounded
+    stream = os.path.getsize(path) > STREAM_THRESHOLD
+    handle = None
     try:
-        with open(path) as handle:
-            data = json.load(handle)
+        if stream:
+            handle = open(path, 'rb')
+            body_id = next(ijson.items(handle, 'maskPublishedName'), None)
+            handle.seek(0)
+            results = ijson.items(handle, 'results.item')
+            results_found = 0
+        else:
+            with open(path, 'rb') as infile:
+                data = orjson.loads(infile.read())
     except Exception as err:
-        LOGGER.error("Could not open %s", path)
         LOGGER.error(TEMPLATE, type(err).__name__, err.args)
-        sys.exit(-1)
-    filedict = dict()
+        raise PPPError("Could not open %s" % (path)) from err
+    if stream:
+        if body_id is None:
+            handle.close()
+            raise PPPError("Invalid format for %s - missing maskPublishedName"
+                           % (path))
+    else:
+        if not check_data_format(data):
+            raise PPPError("Invalid format for %s" % (path))
+        body_id = data['maskPublishedName']
+        results = data['results']
+        results_found = len(results)
+    seen = set()
     # Create destination directory
     if ARG.WRITE:
         newdir = '/'.join([PPP_BASE, ARG.NEURONBRIDGE, ARG.LIBRARY,
                            os.path.basename(path)[0:2]])
         newdir += '/' + os.path.basename(path).split('.')[0]
-        if not os.path.isdir(newdir):
-            try:
-                Path(newdir).mkdir(parents=True, exist_ok=True)
-            except Exception as err:
-                LOGGER.error("Could not create %s", newdir)
-                LOGGER.error(TEMPLATE, type(err).__name__, err.args)
-    if not check_data_format(data):
-        sys.exit(-1)
-    body_id = data['maskPublishedName']
+        try:
+            # Parent directories are pre-created by copy_files, so this is
+            # one syscall in the common case
+            os.mkdir(newdir)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            Path(newdir).mkdir(parents=True, exist_ok=True)
+        except Exception as err:
+            LOGGER.error("Could not create %s", newdir)
+            LOGGER.error(TEMPLATE, type(err).__name__, err.args)
     LOGGER.debug("Processing %s", body_id)
     coll = DBM.pppBodyIds
     check, mongo_id = already_processed(coll, body_id)
+    # When streaming, the result count isn't known yet; -1 keeps an
+    # interrupted run from looking complete (0 == 0+0) to already_processed
     if check == "missing":
-        payload = set_payload(body_id, data)
+        payload = set_payload(body_id, -1 if stream else results_found)
         if ARG.WRITE:
             mongo_id = coll.insert_one(payload).inserted_id
     else:
         if check == "complete":
+            if stream:
+                handle.close()
             return
-        payload = {"resultsFound": len(data['results']), "resultsUpdated": 0,
+        payload = {"resultsFound": -1 if stream else results_found,
+                   "resultsUpdated": 0,
                    "resultsSkipped": 0, "filesFound": 0, "filesUpdated": 0}
         if ARG.WRITE:
             coll.update_one({"_id": mongo_id},
                             {"$set": payload})
     count = {"ffound": 0, "fupdated": 0, "rskipped": 0, "rupdated": 0}
-    # Loop over results
-    for match in data['results']:
-        if 'sourceImageFiles' not in match:
-            LOGGER.debug("No sourceImageFiles for %s in %s",
-                         match['sampleName'], path)
-            count['rskipped'] += 1
-            if ARG.WRITE:
-                coll.update_one({"_id": mongo_id},
-                                {"$set": {"resultsSkipped": count['rskipped']}})
-            continue
-        match['maskPublishedName'] = body_id
-        good = True
-        for key in RENAME_COMPONENTS:
-            if key not in match:
-                good = False
-                LOGGER.error("No %s for %s in %s", match['sampleName'],
-                             key, path)
-        if not good:
-            count['rskipped'] += 1
+    copy_jobs = list()
+    try:
+        # Loop over results
+        for match in results:
+            if stream:
+                results_found += 1
+            if 'sourceImageFiles' not in match:
+                LOGGER.debug("No sourceImageFiles for %s in %s",
+                             match['sampleName'], path)
+                count['rskipped'] += 1
+                if ARG.WRITE:
+                    coll.update_one({"_id": mongo_id},
+                                    {"$set": {"resultsSkipped": count['rskipped']}})
+                continue
+            match['maskPublishedName'] = body_id
+            good = True
+            for key in RENAME_COMPONENTS:
+                if key not in match:
+                    good = False
+                    LOGGER.error("No %s for %s in %s", match['sampleName'],
+                                 key, path)
+            if not good:
+                count['rskipped'] += 1
+                if ARG.WRITE:
+                    coll.update_one({"_id": mongo_id},
+                                    {"$set": {"resultsSkipped": count['rskipped']}})
+                continue
+            count['ffound'] += len(match['sourceImageFiles'])
             if ARG.WRITE:
                 coll.update_one({"_id": mongo_id},
-                                {"$set": {"resultsSkipped": count['rskipped']}})
-            continue
-        count['ffound'] += len(match['sourceImageFiles'])
-        if ARG.WRITE:
-            coll.update_one({"_id": mongo_id},
-                            {"$set": {"filesFound": count['ffound']}})
-        # Loop over files for a single result
-        for img_type, source_path in match['sourceImageFiles'].items():
+                                {"$set": {"filesFound": count['ffound']}})
             if match['publishedName'] == "No Consensus":
                 ERROR_ID[match['maskPublishedName']] = True
-            newname = '%s-%s-%s-%s' % tuple([match[key] for key in RENAME_COMPONENTS])
-            newname += "-%s-%s.png" % (ARG.TEMPLATE, img_type.lower())
-            if newname in filedict:
-                LOGGER.error("Duplicate file name found for %s in %s",
-                             match['sampleName'], path)
-                sys.exit(-1)
-            filedict[newname] = 1
-            # Copy file within /nrs and upload to AWS S3
+            # The filename prefix is invariant across a match's image files
+            newbase = '-'.join([str(match[key]) for key in RENAME_COMPONENTS]
+                               + [ARG.TEMPLATE]) + '-'
+            # Loop over files for a single result
+            for img_type, source_path in match['sourceImageFiles'].items():
+                newname = newbase + img_type.lower() + '.png'
+                if newname in seen:
+                    raise PPPError("Duplicate file name found for %s in %s"
+                                   % (match['sampleName'], path))
+                seen.add(newname)
+                # Copy file within /nrs and upload to AWS S3
+                if ARG.WRITE:
+                    if ARG.NRS:
+                        if ARG.LINK:
+                            write_file(source_path, newdir, newname)
+                        else:
+                            copy_jobs.append((source_path,
+                                              '/'.join([newdir, newname])))
+                    if ARG.AWS:
+                        s3_target = '/'.join([ARG.NEURONBRIDGE, ARG.TEMPLATE,
+                                              re.sub('.*' + ARG.LIBRARY,
+                                                     ARG.LIBRARY, newdir),
+                                              newname])
+                        upload_aws(s3_client, bucket, source_path, s3_target)
+                    count['fupdated'] += 1
+            count['rupdated'] += 1
             if ARG.WRITE:
-                if ARG.NRS:
-                    write_file(source_path, newdir, newname)
-                if ARG.AWS:
-                    s3_target = '/'.join([ARG.NEURONBRIDGE, ARG.TEMPLATE,
-                                          re.sub('.*' + ARG.LIBRARY,
-                                                 ARG.LIBRARY, newdir),
-                                          newname])
-                    upload_aws(s3_client, bucket, source_path, s3_target)
-                count['fupdated'] += 1
                 coll.update_one({"_id": mongo_id},
-                                {"$set": {"filesUpdated": count['fupdated']}})
-        count['rupdated'] += 1
-        if ARG.WRITE:
-            coll.update_one({"_id": mongo_id},
-                            {"$set": {"resultsUpdated": count['rupdated'],
-                                      "updatedDate": datetime.now()}})
+                                {"$set": {"resultsUpdated": count['rupdated'],
+                                          "updatedDate": datetime.now()}})
+    finally:
+        # Close the streamed handle even if a result raises
+        if stream:
+            handle.close()
+    if stream and ARG.WRITE:
+        # The result count isn't known up front when streaming
+        coll.update_one({"_id": mongo_id},
+                        {"$set": {"resultsFound": results_found}})
+    if copy_jobs:
+        copy_file_batch(copy_jobs)
+    # Record updated files only after the deferred copies have succeeded
+    if ARG.WRITE:
+        coll.update_one({"_id": mongo_id},
+                        {"$set": {"filesUpdated": count['fupdated']}})
 
 
 def confirm_run(search_path, body_count):
@@ -483,6 +626,20 @@ def update_summary(bodies, complete=False):
                          {"$set": payload})
 
 
+def scan_json_files(dirpath):
+    """ Generate paths of JSON files in a directory
+        Keyword arguments:
+          dirpath: directory to scan
+        Yields:
+          JSON file paths
+    """
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') \
+               and entry.is_file(follow_symlinks=False):
+                yield entry.path
+
+
 def copy_files():
     """ Copy files specified in JSON files to /nrs/neuronbridge
         Keyword arguments:
@@ -495,7 +652,7 @@ def copy_files():
     if ARG.MANIFOLD != 'prod':
         bucket += '-' + ARG.MANIFOLD
     if not ARG.TEMPLATE or not ARG.LIBRARY:
-        s3_client = initialize_s3()
+        s3_client = get_s3_client()
         if not ARG.TEMPLATE:
             get_template(s3_client, bucket)
         if not ARG.LIBRARY:
@@ -515,16 +672,23 @@ def copy_files():
             for line in bid_file:
                 line = line.strip() + ".json"
                 json_files.append("/".join([search_base, line]))
+    elif ARG.BODYID:
+        search_path = "/".join([search_base, ARG.BODYID + ".json"])
+        json_files = glob(search_path)
     else:
         search_path = "/".join([search_base, "*.json"])
-        if ARG.BODYID:
-            search_path = search_path.replace("*", ARG.BODYID)
-        json_files = glob(search_path)
+        # scandir avoids glob's per-entry stat storm on NFS. The full list
+        # is still needed up front for the confirmation prompt.
+        json_files = list(scan_json_files(search_base))
     if len(json_files) == 1:
-        handle_single_json_file(json_files[0])
+        try:
+            handle_single_json_file(json_files[0])
+        except PPPError as err:
+            LOGGER.critical(str(err))
+            sys.exit(-1)
         return
-    print("Preparing Dask")
-    parallel = []
+    print("Checking body IDs")
+    to_process = []
     coll = DBM.pppBodyIds
     body_count = 0
     prefix = dict()
@@ -534,14 +698,61 @@ def copy_files():
         body_count += 1
         check, mongo_id = already_processed(coll, body_id)
         if check != "complete":
-            parallel.append(dask.delayed(handle_single_json_file)(path))
+            to_process.append(path)
     if not confirm_run(search_path, body_count):
         return
     if ARG.WRITE:
         update_summary(body_count)
-    print("Copying %s%d body IDs" % ("and uploading " if ARG.AWS else "", len(parallel)))
-    with ProgressBar():
-        dask.compute(*parallel, num_workers=12)
+    if ARG.WRITE and ARG.NRS:
+        # Create the per-prefix directories up front so each task needs at
+        # most one mkdir
+        for pfx in prefix:
+            os.makedirs('/'.join([PPP_BASE, ARG.NEURONBRIDGE, ARG.LIBRARY, pfx]),
+                        exist_ok=True)
+    print("Copying %s%d body IDs" % ("and uploading " if ARG.AWS else "", len(to_process)))
+    profilers = list()
+    if ARG.DEBUG:
+        def handle_task(path):
+            # cProfile instruments only its own thread, so profile inside
+            # each worker task
+            task_prof = cProfile.Profile()
+            try:
+                task_prof.runcall(handle_single_json_file, path)
+            finally:
+                profilers.append(task_prof)
+    else:
+        handle_task = handle_single_json_file
+    failed = list()
+    # Submit lazily, keeping a bounded set of futures in flight so the
+    # working set stays small for very large releases
+    path_iter = iter(to_process)
+    with ThreadPoolExecutor(max_workers=ARG.WORKERS) as executor, \
+         tqdm(total=len(to_process), colour='green') as pbar:
+        pending = {executor.submit(handle_task, path): path
+                   for path in islice(path_iter, ARG.WORKERS * 4)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    future.result()
+                except PPPError as err:
+                    LOGGER.error(str(err))
+                    failed.append(path)
+                pbar.update(1)
+            for path in islice(path_iter, len(done)):
+                pending[executor.submit(handle_task, path)] = path
+    if failed:
+        LOGGER.error("Failed to process %d body ID file(s)", len(failed))
+        for path in failed:
+            LOGGER.error("  %s", path)
+    if profilers:
+        stats = pstats.Stats(profilers[0])
+        for task_prof in profilers[1:]:
+            stats.add(task_prof)
+        pfile = "profile_%s_%s.prof" % (ARG.AREA, ARG.NEURONBRIDGE)
+        stats.dump_stats(pfile)
+        print("Wrote profile to %s" % (pfile))
     if ARG.WRITE:
         update_summary(body_count, True)
     # Write error file
@@ -583,6 +794,9 @@ if __name__ == '__main__':
     PARSER.add_argument('--manifold', dest='MANIFOLD', action='store',
                         default='dev', choices=['dev', 'prod', 'devpre', 'prodpre'],
                         help='Mongo / AWS S3 manifold')
+    PARSER.add_argument('--workers', dest='WORKERS', action='store', type=int,
+                        default=min(32, (os.cpu_count() or 1) * 4),
+                        help='Number of worker threads')
     PARSER.add_argument('--nrs', dest='NRS', action='store_true',
                         default=False, help='Write files to /nrs')
     PARSER.add_argument('--aws', dest='AWS', action='store_true',
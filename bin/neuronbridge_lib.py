@@ -6,10 +6,18 @@ import glob
 import os.path
 import re
 import socket
+import sys
 import time
 from simple_term_menu import TerminalMenu
 
 RELEASE_LIBRARY_BASE = "/groups/scicompsoft/informatics/data/release_libraries"
+# Resolve the UID IP component once at import; a DNS lookup per UID is slow
+# and a flakiness risk
+try:
+    IP_COMPONENT = int(socket.gethostbyname(socket.gethostname())
+                       .split('.')[-1]) & 0xFF
+except Exception:
+    IP_COMPONENT = 127
 
 
 def get_all_s3_objects(s3c, **base_kwargs):
@@ -18,16 +26,9 @@ def get_all_s3_objects(s3c, **base_kwargs):
           s3c: S3 client instance
           base_kwargs: arguments for list_objects_v2
     """
-    continuation_token = None
-    while True:
-        list_kwargs = dict(MaxKeys=1000, **base_kwargs)
-        if continuation_token:
-            list_kwargs['ContinuationToken'] = continuation_token
-        response = s3c.list_objects_v2(**list_kwargs)
-        yield from response.get('Contents', [])
-        if not response.get('IsTruncated'):
-            break
-        continuation_token = response.get('NextContinuationToken')
+    paginator = s3c.get_paginator('list_objects_v2')
+    for page in paginator.paginate(**base_kwargs):
+        yield from page.get('Contents', [])
 
 
 def get_library(*args):
@@ -41,7 +42,7 @@ def get_library(*args):
     print("Select a library:")
     cdmlist = list()
     if len(args) == 3:
-        paginator = args[0].get_paginator('list_objects')
+        paginator = args[0].get_paginator('list_objects_v2')
         result = paginator.paginate(Bucket=args[1], Prefix=args[2] + '/', Delimiter='/')
         for prefix in result.search('CommonPrefixes'):
             key = prefix.get('Prefix')
@@ -84,7 +85,7 @@ def get_template(s3_client, bucket):
           Alignment template
     """
     print("Select an alignment template:")
-    paginator = s3_client.get_paginator('list_objects')
+    paginator = s3_client.get_paginator('list_objects_v2')
     result = paginator.paginate(Bucket=bucket, Delimiter='/')
     template = list()
     for prefix in result.search('CommonPrefixes'):
@@ -106,17 +107,11 @@ def generate_jacs_uid(deployment_context=2, last_uid=None):
     current_time_offset = 921700000000
     max_tries = 1023
     current_index = 0
-    try:
-        hostname = socket.gethostname()
-        ipa = socket.gethostbyname(hostname)
-    except Exception:
-        ipa = socket.gethostbyname('localhost')
-    ip_component = int(ipa.split('.')[-1]) & 0xFF
     next_uid = None
     while (current_index <= max_tries) and not next_uid:
         time_component = int(time.time()*1000) - current_time_offset
         time_component = (time_component << 22)
-        next_uid = time_component + (current_index << 12) + (deployment_context << 8) + ip_component
+        next_uid = time_component + (current_index << 12) + (deployment_context << 8) + IP_COMPONENT
         if last_uid and (last_uid == next_uid):
             next_uid = None
             current_index += 1